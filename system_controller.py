@@ -1,25 +1,46 @@
 #!/usr/bin/env python3
 """
 Ubuntu System Media Controller
-Listens to Firebase commands and controls system media/shortcuts
+Streams Firebase commands and controls system media/shortcuts
 """
 
+import asyncio
 import subprocess
 import json
+import logging
 import os
+import queue
+import shlex
+import shutil
 import signal
 import sys
-from datetime import datetime, timedelta
+import time
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import urljoin
 
-# Try to import firebase, install if not present
+# firebase-admin (service account credentials) and aiohttp (RTDB streaming)
+# are required; install_dependencies() reports if either is missing
 try:
     import firebase_admin
-    from firebase_admin import credentials, db
+    from firebase_admin import credentials
 except ImportError:
-    print("Installing firebase-admin...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "firebase-admin", "-q"])
-    import firebase_admin
-    from firebase_admin import credentials, db
+    firebase_admin = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Optional in-process IPC backends; fall back to playerctl/pactl without them
+try:
+    from pydbus import SessionBus
+except ImportError:
+    SessionBus = None
+
+try:
+    import pulsectl
+except ImportError:
+    pulsectl = None
 
 # ============== CONFIGURATION ==============
 # Download this from Firebase Console > Project Settings > Service Accounts > Generate Private Key
@@ -31,216 +52,591 @@ DATABASE_URL = "https://mydashboard-13727-default-rtdb.firebaseio.com"
 
 # Command cooldown (seconds) - prevents duplicate commands
 COMMAND_COOLDOWN = 2
+
+# Identical commands arriving within this window (nanoseconds) are dropped
+DUPLICATE_WINDOW_NS = 250_000_000
+
+# Events arriving within this window (seconds) collapse into the latest one
+DEBOUNCE_WINDOW = 0.05
+
+# Firebase sends a keep-alive every ~30s; reconnect if the stream goes quiet
+STREAM_READ_TIMEOUT = 90
+
+# Delay (seconds) before reconnecting after the stream drops; doubles on each
+# consecutive failure up to MAX_RECONNECT_DELAY
+RECONNECT_DELAY = 2
+MAX_RECONNECT_DELAY = 60
+
+# Redirects to follow when opening the stream (RTDB may answer with a 307)
+MAX_REDIRECTS = 3
+
+# Custom commands are killed after this many seconds
+CUSTOM_COMMAND_TIMEOUT = 10
 # ===========================================
 
+log = logging.getLogger("system_controller")
+_log_listener = None
+
+# Firebase credentials are loaded once per process and reused
+_CRED = None
+
+# Media/system commands are fire-and-forget: no pipes, no waiting on the child.
+# /dev/null is opened once and dup2'd into each child instead of per spawn
+_DEVNULL_FD = os.open(os.devnull, os.O_RDWR)
+
+# asyncio spawns children through subprocess.Popen, so CPython only takes its
+# posix_spawn() fast path (no fork of this process) when the executable is an
+# absolute path and there is no close_fds, pass_fds, preexec_fn, cwd,
+# start_new_session or uid/gid change. The exact conditions vary between
+# Python versions, so keep these kwargs minimal.
+# close_fds=False is safe here: Python opens every fd non-inheritable.
+_SPAWN_KW = dict(
+    stdout=_DEVNULL_FD,
+    stderr=_DEVNULL_FD,
+    stdin=_DEVNULL_FD,
+    close_fds=False,
+)
+
+# Prebuilt argv for each media/system command
+_CMD_PLAY_PAUSE = ("playerctl", "play-pause")
+_CMD_NEXT = ("playerctl", "next")
+_CMD_PREVIOUS = ("playerctl", "previous")
+_CMD_VOLUME_UP = ("pactl", "set-sink-volume", "@DEFAULT_SINK@", "+5%")
+_CMD_VOLUME_DOWN = ("pactl", "set-sink-volume", "@DEFAULT_SINK@", "-5%")
+_CMD_MUTE = ("pactl", "set-sink-mute", "@DEFAULT_SINK@", "toggle")
+_CMD_LOCK_GNOME = ("gnome-screensaver-command", "-l")
+_CMD_LOCK_LOGINCTL = ("loginctl", "lock-session")
+_CMD_SCREENSHOT = ("gnome-screenshot", "-i")
+_CMD_BROWSER = ("xdg-open", "https://google.com")
+_CMD_SPOTIFY = ("spotify",)
+_CMD_TERMINAL = ("gnome-terminal",)
+
+# Custom commands containing any of these are handed to /bin/sh
+_SHELL_METACHARS = ";|&><$`*?[](){}~#\n"
+
 class SystemController:
     def __init__(self):
-        self.last_command_time = datetime.now() - timedelta(seconds=10)
+        self._last_timestamp = None
+        self._last_key = None
+        self._last_ns = time.monotonic_ns() - 10_000_000_000
         self.running = True
+        self._stop = None
+
+        # Handler tasks still in flight (the loop only keeps weak references)
+        self._tasks = set()
+        self._which = {}
+        self._players = {}
+        self._pulse_lock = None
+
+        # Latest not-yet-processed command and the timer that will flush it
+        self._pending = None
+        self._flush_timer = None
+
+        # Pick one lock mechanism up front; loginctl is present on systemd
+        self._lock_cmd = _CMD_LOCK_LOGINCTL if shutil.which("loginctl") else _CMD_LOCK_GNOME
+
+        # Action -> handler routing table, built once
+        self._handlers = {
+            'play': self.play_pause,
+            'pause': self.play_pause,
+            'next': self.next_track,
+            'previous': self.previous_track,
+            'volume_up': self.volume_up,
+            'volume_down': self.volume_down,
+            'mute': self.mute,
+            'lock': self.lock_screen,
+            'screenshot': self.screenshot,
+            'browser': self.open_browser,
+            'spotify': self.open_spotify,
+            'terminal': self.open_terminal,
+        }
+
         self.setup_firebase()
-        self.setup_signal_handlers()
+        self.setup_media_backends()
 
     def setup_firebase(self):
-        """Initialize Firebase connection"""
+        """Load the Firebase service account credentials"""
+        global _CRED
+        if _CRED:
+            return
+
         try:
             if not os.path.exists(FIREBASE_CREDENTIALS_FILE):
-                print(f"❌ Error: {FIREBASE_CREDENTIALS_FILE} not found!")
-                print("📥 Download it from Firebase Console > Project Settings > Service Accounts")
+                log.error(f"❌ Error: {FIREBASE_CREDENTIALS_FILE} not found!")
+                log.info("📥 Download it from Firebase Console > Project Settings > Service Accounts")
                 sys.exit(1)
 
-            cred = credentials.Certificate(FIREBASE_CREDENTIALS_FILE)
-            firebase_admin.initialize_app(cred, {
-                'databaseURL': DATABASE_URL
-            })
-            print("✅ Connected to Firebase!")
+            _CRED = credentials.Certificate(FIREBASE_CREDENTIALS_FILE)
+            log.info("✅ Firebase credentials loaded")
         except Exception as e:
-            print(f"❌ Firebase Error: {e}")
+            log.error(f"❌ Firebase Error: {e}")
             sys.exit(1)
 
-    def setup_signal_handlers(self):
+    def access_token(self):
+        """Fetch an OAuth2 token for the RTDB REST API (blocking)"""
+        return _CRED.get_access_token().access_token
+
+    def setup_media_backends(self):
+        """Open persistent D-Bus (MPRIS) and PulseAudio connections"""
+        self._bus = None
+        self._pulse = None
+
+        if SessionBus:
+            try:
+                self._bus = SessionBus()
+                log.info("✅ D-Bus session connected (MPRIS media control)")
+            except Exception as e:
+                log.warning(f"⚠️  D-Bus unavailable, using playerctl: {e}")
+
+        if pulsectl:
+            try:
+                self._pulse = pulsectl.Pulse('system-controller')
+                log.info("✅ PulseAudio connected (volume control)")
+            except Exception as e:
+                log.warning(f"⚠️  PulseAudio unavailable, using pactl: {e}")
+
+    def setup_signal_handlers(self, loop):
         """Handle Ctrl+C gracefully"""
-        signal.signal(signal.SIGINT, self.shutdown)
-        signal.signal(signal.SIGTERM, self.shutdown)
+        loop.add_signal_handler(signal.SIGINT, self.shutdown)
+        loop.add_signal_handler(signal.SIGTERM, self.shutdown)
 
-    def shutdown(self, signum, frame):
-        """Clean shutdown"""
-        print("\n👋 Shutting down...")
+    def shutdown(self):
+        """Signal run() to stop; safe to call more than once"""
+        if not self.running:
+            return
+        log.info("\n👋 Shutting down...")
         self.running = False
-        sys.exit(0)
+        if self._stop:
+            self._stop.set()
 
     def is_command_fresh(self, timestamp):
         """Check if command is recent enough to execute"""
         if not timestamp:
             return False
-        cmd_time = datetime.fromtimestamp(timestamp / 1000)
-        return (datetime.now() - cmd_time).total_seconds() < COMMAND_COOLDOWN
+        return time.time() * 1000 - timestamp < COMMAND_COOLDOWN * 1000
+
+    # ============== IPC HELPERS ==============
+    # D-Bus and PulseAudio calls are synchronous round-trips (a hung player
+    # can block for the ~25s D-Bus timeout), so they run via asyncio.to_thread
+    # to keep the event loop reading the Firebase stream.
+    def mpris_player(self):
+        """Return the active MPRIS player proxy, or None (blocking)"""
+        names = [name for name in self._bus.dbus.ListNames()
+                 if name.startswith('org.mpris.MediaPlayer2.')]
+
+        # Proxies are cached per player; forget players that have gone away
+        for name in list(self._players):
+            if name not in names:
+                del self._players[name]
+        if not names:
+            return None
+
+        # Prefer whichever player is currently playing
+        for name in names:
+            player = self._players.get(name)
+            if player is None:
+                player = self._players[name] = self._bus.get(name, '/org/mpris/MediaPlayer2')
+            try:
+                if player.PlaybackStatus == 'Playing':
+                    return player
+            except Exception:
+                continue
+        return self._players[names[0]]
+
+    def mpris_invoke(self, method):
+        """Call an MPRIS method on the active player (blocking)"""
+        player = self.mpris_player()
+        if not player:
+            return False
+        getattr(player, method)()
+        return True
+
+    async def mpris_call(self, method, fallback):
+        """Call an MPRIS method in-process, else spawn playerctl"""
+        if self._bus:
+            try:
+                if await asyncio.to_thread(self.mpris_invoke, method):
+                    return
+            except Exception as e:
+                log.warning(f"⚠️  MPRIS {method} failed: {e}")
+        await self.spawn(fallback)
+
+    async def spawn(self, argv):
+        """Launch a fire-and-forget command if its binary is on PATH"""
+        exe = argv[0]
+        if exe not in self._which:
+            self._which[exe] = shutil.which(exe)
+        path = self._which[exe]
+        if not path:
+            log.warning(f"⚠️  {exe} not found, skipping")
+            return False
+        # Absolute executable path keeps subprocess on its posix_spawn path.
+        # The child is not awaited; asyncio reaps it when it exits
+        await asyncio.create_subprocess_exec(*argv, executable=path, **_SPAWN_KW)
+        return True
+
+    def default_sink(self):
+        """Return the current default PulseAudio sink, or None (blocking)"""
+        try:
+            # Looked up per call: sink objects carry a volume snapshot that
+            # goes stale after the first change
+            return self._pulse.get_sink_by_name(self._pulse.server_info().default_sink_name)
+        except Exception as e:
+            log.warning(f"⚠️  PulseAudio lookup failed: {e}")
+            return None
+
+    def pulse_apply(self, change):
+        """Apply change(sink) to the default sink (blocking)"""
+        sink = self.default_sink()
+        if not sink:
+            return False
+        change(sink)
+        return True
+
+    async def pulse_call(self, change, fallback):
+        """Change the default sink in-process, else spawn pactl"""
+        if self._pulse:
+            # pulsectl connections are not thread-safe; one call at a time
+            async with self._pulse_lock:
+                if await asyncio.to_thread(self.pulse_apply, change):
+                    return
+        await self.spawn(fallback)
 
     # ============== MEDIA CONTROLS ==============
-    def play_pause(self):
+    async def play_pause(self):
         """Toggle play/pause for active media"""
-        subprocess.run(["playerctl", "play-pause"], capture_output=True)
-        print("⏯️  Play/Pause")
+        await self.mpris_call('PlayPause', _CMD_PLAY_PAUSE)
+        log.info("⏯️  Play/Pause")
 
-    def next_track(self):
+    async def next_track(self):
         """Next track"""
-        subprocess.run(["playerctl", "next"], capture_output=True)
-        print("⏭️  Next Track")
+        await self.mpris_call('Next', _CMD_NEXT)
+        log.info("⏭️  Next Track")
 
-    def previous_track(self):
+    async def previous_track(self):
         """Previous track"""
-        subprocess.run(["playerctl", "previous"], capture_output=True)
-        print("⏮️  Previous Track")
+        await self.mpris_call('Previous', _CMD_PREVIOUS)
+        log.info("⏮️  Previous Track")
 
-    def volume_up(self):
+    async def volume_up(self):
         """Increase system volume"""
-        subprocess.run(["pactl", "set-sink-volume", "@DEFAULT_SINK@", "+5%"], capture_output=True)
-        print("🔊 Volume Up")
+        await self.pulse_call(
+            lambda sink: self._pulse.volume_change_all_chans(sink, 0.05), _CMD_VOLUME_UP)
+        log.info("🔊 Volume Up")
 
-    def volume_down(self):
+    async def volume_down(self):
         """Decrease system volume"""
-        subprocess.run(["pactl", "set-sink-volume", "@DEFAULT_SINK@", "-5%"], capture_output=True)
-        print("🔉 Volume Down")
+        await self.pulse_call(
+            lambda sink: self._pulse.volume_change_all_chans(sink, -0.05), _CMD_VOLUME_DOWN)
+        log.info("🔉 Volume Down")
 
-    def mute(self):
+    async def mute(self):
         """Toggle mute"""
-        subprocess.run(["pactl", "set-sink-mute", "@DEFAULT_SINK@", "toggle"], capture_output=True)
-        print("🔇 Mute Toggle")
+        await self.pulse_call(
+            lambda sink: self._pulse.mute(sink, not sink.mute), _CMD_MUTE)
+        log.info("🔇 Mute Toggle")
 
     # ============== SYSTEM SHORTCUTS ==============
-    def lock_screen(self):
+    async def lock_screen(self):
         """Lock the screen"""
-        subprocess.run(["gnome-screensaver-command", "-l"], capture_output=True)
-        subprocess.run(["loginctl", "lock-session"], capture_output=True)
-        print("🔒 Screen Locked")
+        await self.spawn(self._lock_cmd)
+        log.info("🔒 Screen Locked")
 
-    def screenshot(self):
+    async def screenshot(self):
         """Take screenshot"""
-        subprocess.run(["gnome-screenshot", "-i"], capture_output=True)
-        print("📸 Screenshot")
+        await self.spawn(_CMD_SCREENSHOT)
+        log.info("📸 Screenshot")
 
-    def open_browser(self):
+    async def open_browser(self):
         """Open default browser"""
-        subprocess.run(["xdg-open", "https://google.com"], capture_output=True)
-        print("🌐 Browser Opened")
+        await self.spawn(_CMD_BROWSER)
+        log.info("🌐 Browser Opened")
 
-    def open_spotify(self):
+    async def open_spotify(self):
         """Open Spotify"""
-        subprocess.run(["spotify"], capture_output=True)
-        print("🎵 Spotify Opened")
+        await self.spawn(_CMD_SPOTIFY)
+        log.info("🎵 Spotify Opened")
 
-    def open_terminal(self):
+    async def open_terminal(self):
         """Open terminal"""
-        subprocess.run(["gnome-terminal"], capture_output=True)
-        print("💻 Terminal Opened")
+        await self.spawn(_CMD_TERMINAL)
+        log.info("💻 Terminal Opened")
 
     # ============== CUSTOM COMMANDS ==============
-    def run_custom(self, command):
-        """Run a custom shell command"""
+    async def run_custom(self, command):
+        """Run a custom command, using a shell only when it needs one"""
+        if not command.strip():
+            log.warning("⚠️  Empty custom command, skipping")
+            return
+
         try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=10)
-            print(f"⚡ Custom: {command}")
-            if result.stdout:
-                print(f"   Output: {result.stdout.strip()}")
+            executable = None
+            if not any(c in command for c in _SHELL_METACHARS):
+                try:
+                    argv = shlex.split(command)
+                except ValueError:
+                    argv = None
+                # Builtins (cd, export, source) and FOO=1 prefixes are not on
+                # PATH, so they still need the shell
+                if argv and '=' not in argv[0]:
+                    executable = shutil.which(argv[0])
+
+            if executable:
+                # argv + absolute executable lets subprocess use posix_spawn
+                proc = await asyncio.create_subprocess_exec(
+                    *argv, executable=executable, close_fds=False,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            else:
+                proc = await asyncio.create_subprocess_shell(
+                    command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), CUSTOM_COMMAND_TIMEOUT)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                log.error(f"❌ Command timed out after {CUSTOM_COMMAND_TIMEOUT}s: {command}")
+                return
+
+            log.info(f"⚡ Custom: {command}")
+            if stdout:
+                log.info(f"   Output: {stdout.decode(errors='replace').strip()}")
         except Exception as e:
-            print(f"❌ Command failed: {e}")
+            log.error(f"❌ Command failed: {e}")
 
     # ============== MAIN LOOP ==============
+    async def run_handler(self, coro):
+        """Await a handler coroutine, reporting any failure"""
+        try:
+            await coro
+        except Exception as e:
+            log.error(f"❌ Command failed: {e}")
+
+    def dispatch(self, coro):
+        """Run a handler as a task so the stream keeps being read"""
+        task = asyncio.create_task(self.run_handler(coro))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def queue_command(self, data):
+        """Hold a command briefly so a burst of events runs only the latest"""
+        self._pending = data
+        if self._flush_timer is None:
+            loop = asyncio.get_running_loop()
+            self._flush_timer = loop.call_later(DEBOUNCE_WINDOW, self.flush_command)
+
+    def flush_command(self):
+        """Process the most recent queued command"""
+        data = self._pending
+        self._pending = None
+        self._flush_timer = None
+        self.process_command(data)
+
     def process_command(self, data):
         """Process incoming Firebase command"""
-        if not data:
+        if not data or not self.running:
             return
 
-        action = data.get('action')
+        # Cheapest check first: skip stale commands and exact re-deliveries
+        # of the last one (the stream replays the current value on reconnect)
         timestamp = data.get('timestamp')
-
-        # Skip old commands
-        if not self.is_command_fresh(timestamp):
+        if timestamp == self._last_timestamp or not self.is_command_fresh(timestamp):
             return
+        self._last_timestamp = timestamp
 
-        # Prevent duplicate rapid commands
-        now = datetime.now()
-        if (now - self.last_command_time).total_seconds() < 0.5:
+        # Drop repeats of the same command (RTDB re-delivers snapshots)
+        action = data.get('action')
+        key = (action, data.get('command'))
+        now = time.monotonic_ns()
+        if key == self._last_key and now - self._last_ns < DUPLICATE_WINDOW_NS:
             return
-        self.last_command_time = now
+        self._last_key = key
+        self._last_ns = now
 
         # Route to appropriate handler
-        handlers = {
-            'play': self.play_pause,
-            'pause': self.play_pause,
-            'next': self.next_track,
-            'previous': self.previous_track,
-            'volume_up': self.volume_up,
-            'volume_down': self.volume_down,
-            'mute': self.mute,
-            'lock': self.lock_screen,
-            'screenshot': self.screenshot,
-            'browser': self.open_browser,
-            'spotify': self.open_spotify,
-            'terminal': self.open_terminal,
-        }
+        handler = self._handlers.get(action)
+        if handler:
+            self.dispatch(handler())
+            return
 
-        if action in handlers:
-            handlers[action]()
-        elif action == 'custom' and 'command' in data:
-            self.run_custom(data['command'])
+        if action == 'custom' and 'command' in data:
+            self.dispatch(self.run_custom(data['command']))
+        else:
+            log.info(f"❓ Unknown action: {action}")
+
+    # ============== FIREBASE STREAM ==============
+    def handle_stream_event(self, event, payload):
+        """Handle one server-sent event; return False to reconnect"""
+        if event == 'put':
+            # The dashboards set() a single command dict at 'media' (no
+            # history is kept), so a put at the root carries only that dict.
+            # Ignore partial/child events.
+            message = json.loads(payload)
+            if message.get('path') == '/' and isinstance(message.get('data'), dict):
+                self.queue_command(message['data'])
+        elif event == 'auth_revoked':
+            log.info("🔑 Firebase token expired, reconnecting...")
+            return False
+        elif event == 'cancel':
+            raise RuntimeError(f"stream cancelled by Firebase: {payload}")
+        return True
+
+    async def stream(self, session, token):
+        """Read 'media' change events; return True if the token was revoked"""
+        # The token goes in a header, never the URL, so it cannot end up in
+        # logged errors. Redirects are followed by hand because aiohttp drops
+        # Authorization when the host changes, and RTDB streams may 307 to a
+        # per-database server
+        url = f"{DATABASE_URL}/media.json"
+        headers = {'Accept': 'text/event-stream', 'Authorization': f'Bearer {token}'}
+        for _ in range(MAX_REDIRECTS):
+            resp = await session.get(url, headers=headers, allow_redirects=False)
+            location = resp.headers.get('Location')
+            if resp.status not in (301, 302, 307, 308) or not location:
+                break
+            resp.release()
+            url = urljoin(str(resp.url), location)
+            if not url.startswith('https://'):
+                raise RuntimeError("Firebase redirected to a non-HTTPS URL")
         else:
-            print(f"❓ Unknown action: {action}")
+            raise RuntimeError("too many redirects opening the Firebase stream")
+
+        async with resp:
+            resp.raise_for_status()
+            log.info("✅ Connected to Firebase!")
+
+            event = None
+            async for raw in resp.content:
+                line = raw.decode('utf-8').rstrip('\r\n')
+                if line.startswith('event:'):
+                    event = line[6:].strip()
+                elif line.startswith('data:'):
+                    if not self.handle_stream_event(event, line[5:].strip()):
+                        return True
+                elif not line:
+                    event = None
+
+    async def listen(self):
+        """Keep a Firebase REST stream open, reconnecting when it drops"""
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=STREAM_READ_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            delay = RECONNECT_DELAY
+            quick_refresh = True
+            while self.running:
+                started = time.monotonic()
+                revoked = False
+                try:
+                    token = await asyncio.to_thread(self.access_token)
+                    revoked = await self.stream(session, token)
+                    if not revoked:
+                        log.warning("⚠️  Firebase stream closed by server")
+                except aiohttp.ClientResponseError as e:
+                    # str(e) includes the request URL; log only the status
+                    log.warning(f"⚠️  Firebase stream dropped: HTTP {e.status} {e.message}")
+                except Exception as e:
+                    log.warning(f"⚠️  Firebase stream dropped: {e}")
+
+                # A long-lived stream was healthy, so start the backoff over
+                if time.monotonic() - started >= MAX_RECONNECT_DELAY:
+                    delay = RECONNECT_DELAY
+                    quick_refresh = True
+
+                # An expired token is refreshed straight away, but only once
+                # in a row; anything else waits so a server that keeps
+                # closing the stream cannot spin us against the token endpoint
+                if revoked and quick_refresh:
+                    quick_refresh = False
+                    continue
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def run(self):
+        """Stream commands from Firebase until shutdown() is called"""
+        self._stop = asyncio.Event()
+        self._pulse_lock = asyncio.Lock()
+        self.setup_signal_handlers(asyncio.get_running_loop())
+
+        listener = asyncio.create_task(self.listen())
+        await self._stop.wait()
+
+        # Tear down: stop new events, let in-flight commands finish
+        listener.cancel()
+        try:
+            await listener
+        except asyncio.CancelledError:
+            pass
+        if self._flush_timer:
+            self._flush_timer.cancel()
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+        if self._pulse:
+            self._pulse.close()
 
     def start(self):
         """Start listening for commands"""
-        print("🚀 System Controller Started!")
-        print("📱 Ready to receive commands from your dashboard...")
-        print("   - Use Play/Pause buttons for media control")
-        print("   - Add volume controls to your dashboard for volume")
-        print("")
-        print("Press Ctrl+C to stop")
-        print("-" * 50)
-
-        # Listen to Firebase
-        media_ref = db.reference('media')
-
-        def listener(event):
-            if event.data:
-                self.process_command(event.data)
-
-        media_ref.listen(listener)
-
-        # Keep running
-        while self.running:
-            import time
-            time.sleep(1)
+        log.info("🚀 System Controller Started!")
+        log.info("📱 Ready to receive commands from your dashboard...")
+        log.info("   - Use Play/Pause buttons for media control")
+        log.info("   - Add volume controls to your dashboard for volume")
+        log.info("")
+        log.info("Press Ctrl+C to stop")
+        log.info("-" * 50)
+
+        asyncio.run(self.run())
+
+
+def setup_logging():
+    """Send log records through a queue so console I/O happens off-thread"""
+    global _log_listener
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = QueueListener(log_queue, handler)
+    _log_listener.start()
+    log.addHandler(QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
 
 
 def install_dependencies():
     """Check and install required system packages"""
-    print("🔧 Checking dependencies...")
+    log.info("🔧 Checking dependencies...")
+
+    # Check for firebase-admin and aiohttp (Python packages)
+    if firebase_admin is None or aiohttp is None:
+        log.error("❌ firebase-admin and aiohttp are required!")
+        log.info("📦 Run: pip install -r requirements.txt")
+        sys.exit(1)
 
     # Check for playerctl (media control)
-    result = subprocess.run(["which", "playerctl"], capture_output=True)
-    if result.returncode != 0:
-        print("📦 Installing playerctl...")
+    if shutil.which("playerctl") is None:
+        log.info("📦 Installing playerctl...")
         subprocess.run(["sudo", "apt-get", "update", "-qq"], capture_output=True)
         subprocess.run(["sudo", "apt-get", "install", "-y", "-qq", "playerctl"], capture_output=True)
-        print("✅ playerctl installed")
+        log.info("✅ playerctl installed")
     else:
-        print("✅ playerctl already installed")
+        log.info("✅ playerctl already installed")
 
     # Check for pactl (volume control)
-    result = subprocess.run(["which", "pactl"], capture_output=True)
-    if result.returncode != 0:
-        print("⚠️  pactl not found. Install pulseaudio-utils for volume control.")
+    if shutil.which("pactl") is None:
+        log.warning("⚠️  pactl not found. Install pulseaudio-utils for volume control.")
 
 
 if __name__ == "__main__":
-    print("=" * 50)
-    print("   🎛️  Ubuntu System Controller")
-    print("=" * 50)
-    print("")
-
-    # Install dependencies
-    install_dependencies()
-    print("")
-
-    # Start controller
-    controller = SystemController()
-    controller.start()
+    setup_logging()
+
+    try:
+        log.info("=" * 50)
+        log.info("   🎛️  Ubuntu System Controller")
+        log.info("=" * 50)
+        log.info("")
+
+        # Install dependencies
+        install_dependencies()
+        log.info("")
+
+        # Start controller
+        controller = SystemController()
+        controller.start()
+    finally:
+        _log_listener.stop()